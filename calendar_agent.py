@@ -1,164 +1,546 @@
-from flask import Flask, request, jsonify
+from quart import Quart, Response, request
 import os
-import json
-from datetime import datetime, timedelta
+import re
+import asyncio
+import atexit
+import logging
+import logging.handlers
+import queue
+import uuid
+from collections import OrderedDict
+from urllib.parse import quote
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-import pytz
+import ciso8601
+import orjson
+import httpx
+import httplib2
+import google_auth_httplib2
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
-from groq import Groq
+from google.auth.transport.requests import AuthorizedSession
+from groq import AsyncGroq
 
 # ----------------- Load ENV -----------------
 load_dotenv()
-app = Flask(__name__)
+app = Quart(__name__)
+
+# ----------------- LOGGING -----------------
+# Handlers only enqueue records; a background listener does the stderr writes
+logger = logging.getLogger("calendar_agent")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+logger.propagate = False
+_log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
 # ----------------- CONFIG -----------------
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 GOOGLE_CREDENTIALS_PATH = os.getenv("GOOGLE_CREDENTIALS_PATH", "/etc/secrets/google_service_key.json")
+GOOGLE_CREDENTIALS_JSON = os.getenv("GOOGLE_CREDENTIALS_JSON")  # optional inline key, wins over the path
 GOOGLE_CALENDAR_ID = os.getenv("GOOGLE_CALENDAR_ID")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-IST = pytz.timezone("Asia/Kolkata")
+CALENDAR_API_BASE = "https://www.googleapis.com/calendar/v3"
+BATCH_LIMIT = 50  # Google's per-batch sub-request cap
+CALENDAR_URL = f"{CALENDAR_API_BASE}/calendars/{quote(GOOGLE_CALENDAR_ID or '', safe='')}"
+IST_NAME = "Asia/Kolkata"
+# Asia/Kolkata has no DST, so a fixed +05:30 offset is exact and skips pytz.localize
+IST = timezone(timedelta(hours=5, minutes=30), IST_NAME)
+# Common shape: YYYY-MM-DD[T ]HH:MM[:SS[.ffffff]][Z|±HH:MM]
+ISO_DATETIME_RE = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2})"
+    r"(?::(\d{2})(?:\.(\d{1,6})\d*)?)?"
+    r"(?:(Z)|([+-])(\d{2}):?(\d{2}))?"
+)
+# Exactly what datetime.isoformat() emits for whole-second IST times; strings in
+# this form sort chronologically, so they can be compared without parsing
+CANONICAL_IST_RE = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\+05:30")
+MAX_MESSAGE_CHARS = 8000  # ~2k tokens; bounds Groq prefill time and TPM usage
+AI_PARSE_CACHE_SIZE = int(os.getenv("AI_PARSE_CACHE_SIZE", 1024))
+QUEUE_FLUSH_SECONDS = 0.05  # deferred events wait at most this long to share a batch
+EVENT_JOBS_MAX = 10000  # outcomes kept for /event_status polling
+MAX_BATCH_EVENTS = 200  # events accepted by one /create_events call
+MAX_CONCURRENT_PARSES = 10  # Groq event parses in flight per worker
 
 # ----------------- AUTHENTICATION -----------------
+creds = None
 service = None
+session = None
 try:
-    creds = service_account.Credentials.from_service_account_file(
-        GOOGLE_CREDENTIALS_PATH, scopes=SCOPES
-    )
+    if GOOGLE_CREDENTIALS_JSON:
+        creds = service_account.Credentials.from_service_account_info(
+            orjson.loads(GOOGLE_CREDENTIALS_JSON), scopes=SCOPES
+        )
+    else:
+        creds = service_account.Credentials.from_service_account_file(
+            GOOGLE_CREDENTIALS_PATH, scopes=SCOPES
+        )
     service = build("calendar", "v3", credentials=creds)
-    print("✅ Google Calendar Agent authenticated successfully.")
+
+    # Shared keep-alive pool for event inserts (thread-safe, unlike httplib2)
+    session = AuthorizedSession(creds)
+    session.mount("https://", HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=100,
+        max_retries=Retry(total=3, backoff_factor=0.2),
+    ))
+    logger.info("✅ Google Calendar Agent authenticated successfully.")
 except Exception as e:
-    print("❌ Google Auth Error:", e)
+    logger.error("❌ Google Auth Error: %s", e)
+
+# Persistent HTTP/2 keep-alive pool to api.groq.com; transient failures are retried
+client = AsyncGroq(
+    api_key=GROQ_API_KEY,
+    timeout=15.0,
+    max_retries=2,
+    http_client=httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=50, keepalive_expiry=60),
+    ),
+)
+
+
+class EventInputError(ValueError):
+    """Raised for event payloads the caller has to fix; carries the HTTP status."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+# (normalized message, today's date) -> raw Groq JSON; the date in the key
+# makes entries for relative phrases ("tomorrow 4pm") expire at midnight
+_ai_parse_cache = OrderedDict()
+
+# Bounds concurrent Groq parses across all requests (e.g. one large /create_events)
+_parse_semaphore = asyncio.Semaphore(MAX_CONCURRENT_PARSES)
+
+# Formatted "YYYY-MM-DD (Weekday)" for the current IST day
+_today_cache = {"date": None, "str": None}
+
+# Deferred creation (?async=true): handlers enqueue (job_id, event_body) and a
+# background consumer flushes them to Calendar in batches
+event_queue = None
+event_consumer_task = None
+event_jobs = OrderedDict()
+
+# "±HH:MM" -> reusable tzinfo, so repeated offsets never allocate a new one
+_offset_cache = {"+05:30": IST}
 
-client = Groq(api_key=GROQ_API_KEY)
 
 # ----------------- HELPERS -----------------
-def parse_message_with_ai(message: str):
+def json_response(payload, status: int = 200):
+    """orjson-encoded JSON response (stands in for jsonify)."""
+    return Response(orjson.dumps(payload), status=status, mimetype="application/json")
+
+
+def _fixed_offset(sign: str, hours: str, minutes: str):
+    key = f"{sign}{hours}:{minutes}"
+    tz = _offset_cache.get(key)
+    if tz is None:
+        delta = timedelta(hours=int(hours), minutes=int(minutes))
+        tz = _offset_cache[key] = timezone(-delta if sign == "-" else delta)
+    return tz
+
+
+def parse_iso_datetime(value: str) -> datetime:
     """
-    Use Groq LLM to extract title, start_time, and end_time from plain English.
-    Adds current date context to prevent year mismatch.
+    Parses an ISO 8601 timestamp into an aware datetime; naive values are IST.
+    The common shape is built directly from regex groups, anything else goes
+    to ciso8601.
+    """
+    m = ISO_DATETIME_RE.fullmatch(value)
+    if m is None:
+        dt = ciso8601.parse_datetime(value)
+        return dt if dt.tzinfo else dt.replace(tzinfo=IST)
+
+    year, month, day, hour, minute, second, fraction, zulu, sign, off_h, off_m = m.groups()
+    if zulu:
+        tz = timezone.utc
+    elif sign:
+        tz = _fixed_offset(sign, off_h, off_m)
+    else:
+        tz = IST
+    return datetime(
+        int(year), int(month), int(day), int(hour), int(minute),
+        int(second or 0), int(fraction.ljust(6, "0")) if fraction else 0,
+        tzinfo=tz,
+    )
+
+
+def insert_calendar_event(event_body: dict):
+    """Blocking Calendar insert over the pooled session; run it via asyncio.to_thread."""
+    r = session.post(f"{CALENDAR_URL}/events", json=event_body, timeout=20)
+    r.raise_for_status()
+    return r.json()
+
+
+def insert_calendar_events_batch(event_bodies: list):
     """
-    today_str = datetime.now(IST).strftime("%Y-%m-%d (%A)")
-    system_prompt = f"""
+    Blocking bulk insert, up to BATCH_LIMIT events per HTTP round trip.
+    Returns one (event, error) tuple per body, in input order.
+    """
+    results = {}
+
+    def on_created(request_id, response, exception):
+        results[request_id] = (response, exception)
+
+    # Batches go through httplib2, which is not thread-safe: use a private transport
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+    for offset in range(0, len(event_bodies), BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=on_created)
+        for i, body in enumerate(event_bodies[offset:offset + BATCH_LIMIT], offset):
+            batch.add(
+                service.events().insert(calendarId=GOOGLE_CALENDAR_ID, body=body),
+                request_id=str(i),
+            )
+        batch.execute(http=http)
+
+    return [results.get(str(i), (None, "No response from batch")) for i in range(len(event_bodies))]
+
+
+def event_summary(event: dict) -> dict:
+    """Fields of a created Calendar event that we echo back to callers."""
+    return {
+        "event_title": event.get("summary"),
+        "start": event.get("start", {}).get("dateTime"),
+        "end": event.get("end", {}).get("dateTime"),
+        "html_link": event.get("htmlLink"),
+    }
+
+
+def warm_calendar_connection():
+    """Mint the OAuth token and open a pooled TLS connection with a cheap read."""
+    r = session.get(CALENDAR_URL, timeout=10)
+    r.raise_for_status()
+
+
+# Kept byte-identical across requests so Groq's prefix cache can reuse it;
+# the per-day date goes in a separate message after it
+# Structured extraction is easy for the 8B model and it answers ~3x faster
+EVENT_PARSER_MODEL = os.getenv("EVENT_PARSER_MODEL", "llama-3.1-8b-instant")
+EVENT_PARSER_PROMPT = """
     You are a precise meeting time parser.
-    Today's date is {today_str}.
     Given a meeting request, extract:
-    {{
+    {
         "title": "<title>",
         "start_time": "<ISO datetime format, Asia/Kolkata timezone>",
         "end_time": "<ISO datetime format, Asia/Kolkata timezone>"
-    }}
+    }
     - The year must be 2025 (or current year).
     - Never output past dates.
     - If time only is given (like 'tomorrow 4 PM'), assume the next valid occurrence.
     - Always output valid JSON.
-    - If end_time not given, assume 30 minutes after start_time.
+    - Always include end_time; if no end or duration is given, set it 30 minutes after start_time.
+    """
+
+
+def _today_str(now: datetime) -> str:
+    """strftime runs once per IST calendar day; later calls reuse the string."""
+    day = now.date()
+    if _today_cache["date"] != day:
+        _today_cache.update(date=day, str=day.strftime("%Y-%m-%d (%A)"))
+    return _today_cache["str"]
+
+
+async def parse_message_with_ai(message: str):
+    """
+    Use Groq LLM to extract title, start_time, and end_time from plain English.
+    Adds current date context to prevent year mismatch.
     """
+    now = datetime.now(IST)
+    today_str = _today_str(now)
 
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": message}
-            ],
-            temperature=0.3,
-            response_format={"type": "json_object"}
-        )
-        parsed = json.loads(completion.choices[0].message.content)
+        cache_key = (message.strip().lower(), today_str)
+        raw = _ai_parse_cache.get(cache_key)
+        if raw is not None:
+            _ai_parse_cache.move_to_end(cache_key)
+        else:
+            async with _parse_semaphore:
+                completion = await client.chat.completions.create(
+                    model=EVENT_PARSER_MODEL,
+                    messages=[
+                        {"role": "system", "content": EVENT_PARSER_PROMPT},
+                        {"role": "system", "content": f"Today's date is {today_str}."},
+                        {"role": "user", "content": message}
+                    ],
+                    temperature=0,
+                    max_tokens=200,
+                    response_format={"type": "json_object"}
+                )
+            raw = completion.choices[0].message.content
+        parsed = orjson.loads(raw)
+        _ai_parse_cache[cache_key] = raw
+        if len(_ai_parse_cache) > AI_PARSE_CACHE_SIZE:
+            _ai_parse_cache.popitem(last=False)
 
         # --- Safety correction: if AI date < now, push to future ---
-        for key in ["start_time", "end_time"]:
-            if key in parsed:
-                dt = datetime.fromisoformat(parsed[key])
-                if dt < datetime.now(IST):
-                    dt = dt.replace(year=datetime.now(IST).year)
-                    if dt < datetime.now(IST):
+        for key in ("start_time", "end_time"):
+            value = parsed.get(key)
+            if value:
+                dt = parse_iso_datetime(value)
+                if dt < now:
+                    dt = dt.replace(year=now.year)
+                    if dt < now:
                         dt += timedelta(days=1)
                     parsed[key] = dt.isoformat()
         return parsed
 
     except Exception as e:
-        print("⚠️ Groq parsing failed:", e)
+        logger.warning("⚠️ Groq parsing failed: %s", e)
         return None
 
 
+def make_event_body(title: str, description: str, start_iso: str, end_iso: str) -> dict:
+    """Calendar event body from already-formatted ISO timestamps."""
+    return {
+        "summary": title,
+        "description": description,
+        "start": {"dateTime": start_iso, "timeZone": IST_NAME},
+        "end": {"dateTime": end_iso, "timeZone": IST_NAME},
+    }
+
+
+async def build_event_body(data: dict) -> dict:
+    """
+    Turns one /create_event payload into a Calendar event body.
+    Raises EventInputError for payloads the caller has to fix.
+    """
+    if not isinstance(data, dict):
+        raise EventInputError("Event payload must be a JSON object")
+
+    # --- Step 1: If plain message provided, extract via Groq ---
+    if "message" in data and not data.get("start_time"):
+        if len(data["message"]) > MAX_MESSAGE_CHARS:
+            raise EventInputError(f"message exceeds {MAX_MESSAGE_CHARS} characters", 413)
+        ai_parsed = await parse_message_with_ai(data["message"])
+        if not ai_parsed:
+            raise EventInputError("Could not parse event from message")
+        data = {**data, **ai_parsed}
+
+    title = data.get("title", "Untitled Event")
+    description = data.get("description", "")
+    start_time = data.get("start_time")
+    end_time = data.get("end_time")
+
+    if not start_time:
+        raise EventInputError("start_time is required")
+
+    # --- Fast path: canonical IST strings in the future are passed through as-is ---
+    now = datetime.now(IST)
+    if (
+        isinstance(start_time, str) and isinstance(end_time, str)
+        and CANONICAL_IST_RE.fullmatch(start_time)
+        and CANONICAL_IST_RE.fullmatch(end_time)
+        and start_time >= now.isoformat(timespec="seconds")
+    ):
+        return make_event_body(title, description, start_time, end_time)
+
+    # --- Step 2: Parse and localize ---
+    start_dt = parse_iso_datetime(start_time)
+    end_dt = parse_iso_datetime(end_time) if end_time else start_dt + timedelta(minutes=30)
+
+    # --- Step 3: Ensure date is not in past ---
+    if start_dt < now:
+        logger.info("⚠️ Adjusting event to next valid day...")
+        start_dt += timedelta(days=1)
+        end_dt += timedelta(days=1)
+
+    return make_event_body(title, description, start_dt.isoformat(), end_dt.isoformat())
+
+
+def set_job_status(job_id: str, status: dict):
+    event_jobs[job_id] = status
+    event_jobs.move_to_end(job_id)
+    if len(event_jobs) > EVENT_JOBS_MAX:
+        event_jobs.popitem(last=False)
+
+
+async def consume_event_queue():
+    """Drains event_queue: up to BATCH_LIMIT events or QUEUE_FLUSH_SECONDS per batch."""
+    loop = asyncio.get_running_loop()
+    while True:
+        jobs = [await event_queue.get()]
+        deadline = loop.time() + QUEUE_FLUSH_SECONDS
+        while len(jobs) < BATCH_LIMIT:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                jobs.append(await asyncio.wait_for(event_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            created = await asyncio.to_thread(
+                insert_calendar_events_batch, [body for _, body in jobs]
+            )
+        except Exception as e:
+            logger.error("❌ Deferred batch failed: %s", e)
+            created = [(None, e)] * len(jobs)
+
+        for (job_id, _), (event, error) in zip(jobs, created):
+            if error is not None:
+                set_job_status(job_id, {"status": "failed", "error": str(error)})
+            else:
+                set_job_status(job_id, {"status": "created", **event_summary(event)})
+        logger.info("📆 Flushed %d deferred events", len(jobs))
+
+
+# ----------------- STARTUP -----------------
+@app.before_serving
+async def warmup():
+    """Runs once per worker so the first user request skips the TLS + token handshake."""
+    if not session:
+        return
+    try:
+        await asyncio.to_thread(warm_calendar_connection)
+        logger.info("🔥 Google Calendar connection warmed up.")
+    except Exception as e:
+        logger.warning("⚠️ Calendar warmup failed: %s", e)
+
+
+@app.before_serving
+async def warm_groq_prompt():
+    """One tiny completion so the shared system-prompt prefix is cached before real traffic."""
+    try:
+        await client.chat.completions.create(
+            model=EVENT_PARSER_MODEL,
+            messages=[{"role": "system", "content": EVENT_PARSER_PROMPT}],
+            max_tokens=1,
+        )
+        logger.info("🔥 Groq prompt prefix warmed up.")
+    except Exception as e:
+        logger.warning("⚠️ Groq warmup failed: %s", e)
+
+
+@app.before_serving
+async def start_event_consumer():
+    global event_queue, event_consumer_task
+    event_queue = asyncio.Queue()
+    event_consumer_task = asyncio.create_task(consume_event_queue())
+
+
+@app.after_serving
+async def stop_event_consumer():
+    if event_consumer_task:
+        event_consumer_task.cancel()
+
+
 # ----------------- ROUTES -----------------
 @app.route("/", methods=["GET"])
-def health():
-    return jsonify({"status": "✅ Google Calendar Agent Running"}), 200
+async def health():
+    return json_response({"status": "✅ Google Calendar Agent Running"}, 200)
 
 
 @app.route("/create_event", methods=["POST"])
-def create_event():
-    """Creates an event in Google Calendar."""
+async def create_event():
+    """
+    Creates an event in Google Calendar. With ?async=true the event is queued
+    for the next batch and a job id is returned (202) for /event_status.
+    """
     if not service:
-        return jsonify({"error": "Google Calendar service not initialized"}), 500
+        return json_response({"error": "Google Calendar service not initialized"}, 500)
 
     try:
-        data = request.get_json(force=True)
-        print("📩 Incoming event data:", json.dumps(data, indent=2))
-
-        # --- Step 1: If plain message provided, extract via Groq ---
-        if "message" in data and not data.get("start_time"):
-            ai_parsed = parse_message_with_ai(data["message"])
-            if not ai_parsed:
-                return jsonify({"error": "Could not parse event from message"}), 400
-            data.update(ai_parsed)
-
-        title = data.get("title", "Untitled Event")
-        description = data.get("description", "")
-        start_time = data.get("start_time")
-        end_time = data.get("end_time")
-
-        if not start_time:
-            return jsonify({"error": "start_time is required"}), 400
-
-        # --- Step 2: Parse and localize ---
-        start_dt = datetime.fromisoformat(start_time)
-        if start_dt.tzinfo is None:
-            start_dt = IST.localize(start_dt)
-
-        if end_time:
-            end_dt = datetime.fromisoformat(end_time)
-            if end_dt.tzinfo is None:
-                end_dt = IST.localize(end_dt)
-        else:
-            end_dt = start_dt + timedelta(minutes=30)
-
-        # --- Step 3: Ensure date is not in past ---
-        now = datetime.now(IST)
-        if start_dt < now:
-            print("⚠️ Adjusting event to next valid day...")
-            start_dt += timedelta(days=1)
-            end_dt += timedelta(days=1)
-
-        # --- Step 4: Create Event ---
-        event_body = {
-            "summary": title,
-            "description": description,
-            "start": {"dateTime": start_dt.isoformat(), "timeZone": "Asia/Kolkata"},
-            "end": {"dateTime": end_dt.isoformat(), "timeZone": "Asia/Kolkata"},
-        }
-
-        event = service.events().insert(calendarId=GOOGLE_CALENDAR_ID, body=event_body).execute()
-
-        print(f"📆 Event Created: {event.get('htmlLink')}")
-        return jsonify({
+        data = orjson.loads(await request.get_data(cache=False))
+        logger.debug("📩 Incoming event data: %s", data)
+
+        try:
+            event_body = await build_event_body(data)
+        except EventInputError as e:
+            return json_response({"error": str(e)}, e.status)
+
+        if request.args.get("async", "").lower() in ("1", "true", "yes"):
+            job_id = uuid.uuid4().hex
+            set_job_status(job_id, {"status": "queued"})
+            event_queue.put_nowait((job_id, event_body))
+            return json_response({"status": "queued", "id": job_id}, 202)
+
+        event = await asyncio.to_thread(insert_calendar_event, event_body)
+
+        logger.info("📆 Event Created: %s", event.get("htmlLink"))
+        return json_response({
             "status": "✅ Event Created Successfully",
-            "event_title": event.get("summary"),
-            "start": event.get("start", {}).get("dateTime"),
-            "end": event.get("end", {}).get("dateTime"),
-            "html_link": event.get("htmlLink"),
-        }), 200
+            **event_summary(event),
+        }, 200)
 
     except Exception as e:
-        print("❌ Error creating calendar event:", e)
-        return jsonify({"error": str(e)}), 500
+        logger.error("❌ Error creating calendar event: %s", e)
+        return json_response({"error": str(e)}, 500)
+
+
+@app.route("/create_events", methods=["POST"])
+async def create_events():
+    """
+    Creates many events at once. Accepts a JSON list (or {"events": [...]})
+    of /create_event payloads and inserts them through Calendar batch requests.
+    """
+    if not service:
+        return json_response({"error": "Google Calendar service not initialized"}, 500)
+
+    try:
+        data = orjson.loads(await request.get_data(cache=False))
+        items = data.get("events") if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return json_response({"error": "Expected a non-empty list of events"}, 400)
+        if len(items) > MAX_BATCH_EVENTS:
+            return json_response({"error": f"at most {MAX_BATCH_EVENTS} events per request"}, 413)
+
+        prepared = await asyncio.gather(
+            *(build_event_body(item) for item in items), return_exceptions=True
+        )
+
+        results = [None] * len(items)
+        pending = []
+        for i, outcome in enumerate(prepared):
+            if isinstance(outcome, Exception):
+                results[i] = {"index": i, "error": str(outcome)}
+            else:
+                pending.append((i, outcome))
+
+        if pending:
+            created = await asyncio.to_thread(
+                insert_calendar_events_batch, [body for _, body in pending]
+            )
+            for (i, _), (event, error) in zip(pending, created):
+                if error is not None:
+                    results[i] = {"index": i, "error": str(error)}
+                else:
+                    results[i] = {"index": i, "status": "created", **event_summary(event)}
+
+        created_count = sum(1 for r in results if "error" not in r)
+        logger.info("📆 Batch created %d/%d events", created_count, len(items))
+        return json_response({
+            "status": "✅ Batch Processed",
+            "created": created_count,
+            "failed": len(items) - created_count,
+            "results": results,
+        }, 200)
+
+    except Exception as e:
+        logger.error("❌ Error creating calendar events: %s", e)
+        return json_response({"error": str(e)}, 500)
+
+
+@app.route("/event_status/<job_id>", methods=["GET"])
+async def event_status(job_id):
+    """Outcome of an event queued with /create_event?async=true."""
+    status = event_jobs.get(job_id)
+    if status is None:
+        return json_response({"error": "Unknown job id"}, 404)
+    return json_response({"id": job_id, **status}, 200)
 
 
 # ----------------- MAIN -----------------
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 10000))
-    print(f"🚀 Running on port {port}")
+    logger.info("🚀 Running on port %d", port)
     app.run(host="0.0.0.0", port=port)
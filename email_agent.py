@@ -1,94 +1,551 @@
-from flask import Flask, request, jsonify
+from quart import Quart, Response, request
 import os
-import requests
+import logging
+import orjson
+import asyncio
+import httpx
 from dotenv import load_dotenv
-from groq import Groq
+from groq import AsyncGroq, NotFoundError
 import re
-import traceback
+import html
+import hashlib
+import uuid
+import time
+from string import Template
+from dataclasses import dataclass
+from cachetools import TLRUCache, TTLCache
 
 # ---------------- Load Environment ----------------
 load_dotenv()
-app = Flask(__name__)
+logging.basicConfig(level=logging.INFO)
+app = Quart(__name__)
 
 # ---------------- Configuration ----------------
 BREVO_API_KEY = os.getenv("BREVO_API_KEY")
 SENDER_EMAIL = os.getenv("SENDER_EMAIL", "pos-agent@mvp.com")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+EMAIL_TEMPERATURE = 0.65
+MAX_CONTEXT_CHARS = 8000  # ~2k tokens; bounds Groq prefill time and TPM usage
+IDEMPOTENCY_TTL = 60  # seconds a successful send suppresses identical retries
+DRAFT_CACHE_SIZE = int(os.getenv("DRAFT_CACHE_SIZE", 2048))
+DRAFT_CACHE_TTL = 3600  # seconds a clean JSON draft is reused
+FALLBACK_DRAFT_TTL = 60  # drafts salvaged from non-JSON output are retried soon
+DRAFT_JOB_WORKERS = 4  # concurrent background draft jobs per process
+DRAFT_JOB_TTL = 3600  # seconds a job outcome stays pollable
+DRAFT_BATCH_SIZE = 8  # most contexts folded into one Groq call
+DRAFT_BATCH_WINDOW = 0.02  # seconds a draft waits for others to join its batch
+BULK_MAX_ITEMS = 1000  # drafts accepted by one /create_draft_bulk call
+BULK_POLL_INTERVAL = 30  # seconds between Groq batch status checks
+BULK_BATCH_TTL = 86400  # seconds a finished bulk batch stays pollable
+BULK_BATCH_TAG = "email-agent-bulk"  # Groq batch metadata marking our batches
+
+# One HTTP/2 keep-alive pool shared by Groq and Brevo calls; concurrent
+# requests to the same host multiplex over one TLS connection
+http_client = httpx.AsyncClient(
+    timeout=20,
+    transport=httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=10, max_connections=50),
+    ),
+)
+client = AsyncGroq(api_key=GROQ_API_KEY, http_client=http_client)
+
+
+# Compiled once instead of per request
+EMAIL_RE = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
+SUBJECT_RE = re.compile(r"Subject:\s*(.*)")
+BODY_SPLIT_RE = re.compile(r"Body:\s*")
+
+# Sent unchanged as the first message of every completion so Groq's
+# prefix cache can reuse it across drafts
+EMAIL_MODEL = os.getenv("EMAIL_MODEL", "llama-3.3-70b-versatile")
+EMAIL_SYSTEM_PROMPT = """
+    You are a professional email writer.
+    Write a short, polite, and clear business email based on the given context.
+    Respond with a single JSON object:
 
-client = Groq(api_key=GROQ_API_KEY)
+    {"subject": "<a short, professional subject line>",
+     "body": "<A professional email body written in a natural tone, with a greeting, 2–3 concise paragraphs, and a closing.>"}
 
+    Separate paragraphs in the body with newlines. Do NOT use markdown or code fences.
+    """
 
-# ---------------- Utility: Extract Recipient ----------------
-def extract_recipient(context: str):
+BATCH_DRAFT_INSTRUCTIONS = """
+    You will receive several numbered email contexts. Write one email per item,
+    following the guidance above, but instead of a single email object reply with
+    {"emails": [{"subject": "<subject>", "body": "<body>"}, ...]}
+    with exactly one entry per item, in the same order.
     """
-    Extracts an email address from the user's text.
-    Example: "Send an email to john@example.com about project status"
+
+# Groq cannot stream in JSON mode, so streamed drafts use the labelled text
+# format that parse_draft_text understands
+STREAM_DRAFT_INSTRUCTIONS = """
+    Instead of JSON, reply in plain text as:
+    Subject: <subject>
+    Body: <body>
     """
-    match = re.search(r"[\w\.-]+@[\w\.-]+\.\w+", context)
-    if match:
-        return match.group(0)
-    return None
 
+# Running totals reported on GET /, to confirm system-prompt cache hits
+prompt_cache_stats = {"prompt_tokens": 0, "cached_tokens": 0}
 
-# ---------------- Utility: AI Email Draft ----------------
-def generate_ai_email(context: str) -> dict:
+# blake2b(prompt|context|model|temperature) -> {"subject", "body"}
+# Values are (draft, from_json); the TTL depends on how cleanly the draft parsed
+_draft_cache = TLRUCache(
+    maxsize=DRAFT_CACHE_SIZE,
+    ttu=lambda _key, value, now: now + (DRAFT_CACHE_TTL if value[1] else FALLBACK_DRAFT_TTL),
+)
+
+# blake2b(recipient|subject|body) -> Brevo response of a recent successful send
+_recent_sends = TTLCache(maxsize=4096, ttl=IDEMPOTENCY_TTL)
+
+# (batch_key, context, future) waiting for run_draft_batcher; created in before_serving
+draft_queue = None
+draft_batcher_task = None
+draft_batch_tasks = set()
+
+# Background /create_draft?async=true jobs: queue, workers and recent outcomes
+job_queue = None
+job_worker_tasks = []
+draft_jobs = TTLCache(maxsize=10000, ttl=DRAFT_JOB_TTL)
+
+# Groq batch id -> /create_draft_bulk state, advanced by run_bulk_poller. A plain
+# dict so pending batches are never evicted; Groq's copy of the input file is
+# the durable record (see recover_bulk_batch)
+bulk_batches = {}
+bulk_poller_task = None
+
+
+# ---------------- Request Model ----------------
+class DraftInputError(ValueError):
+    """Raised for draft payloads the caller has to fix; carries the HTTP status."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass(slots=True)
+class DraftRequest:
+    """Validated /create_draft payload."""
+    context: str
+    to: str | None
+
+    @classmethod
+    def from_json(cls, raw: bytes) -> "DraftRequest":
+        return cls.from_dict(orjson.loads(raw))
+
+    @classmethod
+    def from_dict(cls, data) -> "DraftRequest":
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        context = data.get("context") or ""
+        to = data.get("to") or None
+        if not isinstance(context, str) or not isinstance(to, (str, type(None))):
+            raise ValueError("'context' and 'to' must be strings")
+        return cls(context=context, to=to)
+
+
+# ---------------- Utility: JSON Response ----------------
+def json_response(payload, status: int = 200):
+    """orjson-encoded JSON response (stands in for jsonify)."""
+    return Response(orjson.dumps(payload), status=status, mimetype="application/json")
+
+
+def sse_event(event: str, payload) -> bytes:
+    """One text/event-stream frame with an orjson-encoded data line."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(payload) + b"\n\n"
+
+
+# ---------------- Utility: Resolve Recipient ----------------
+def resolve_draft(draft_request: DraftRequest):
     """
-    Uses Groq LLM to generate a well-written, professional email.
-    No JSON format from the model — we handle formatting ourselves.
+    Returns (recipient, sanitized_context) for a validated request.
+    Raises DraftInputError (413 when the context is too long, 400 when no
+    recipient is found).
     """
-    system_prompt = """
-    You are a professional email writer.
-    Write a short, polite, and clear business email based on the given context.
-    The format should be:
+    if len(draft_request.context) > MAX_CONTEXT_CHARS:
+        raise DraftInputError(f"context exceeds {MAX_CONTEXT_CHARS} characters", 413)
 
-    Subject: <a short, professional subject line>
+    # One scan both strips addresses from the AI context and collects them
+    found = []
+    sanitized_context = EMAIL_RE.sub(lambda m: found.append(m.group(0)) or "", draft_request.context)
 
-    Body:
-    <A professional email body written in a natural tone, with a greeting, 2–3 concise paragraphs, and a closing.>
+    # Extract recipient dynamically
+    recipient = draft_request.to or (found[0] if found else None)
+    if not recipient:
+        raise DraftInputError("No valid recipient found in the message.")
+    return recipient, sanitized_context
 
-    Do NOT use markdown, code fences, or JSON.
-    """
 
-    completion = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": context},
-        ],
-        temperature=0.65,
-        max_tokens=500,
-    )
+# ---------------- Utility: AI Email Draft ----------------
+def draft_cache_key(context: str) -> bytes:
+    return hashlib.blake2b(
+        f"{EMAIL_SYSTEM_PROMPT}|{context}|{EMAIL_MODEL}|{EMAIL_TEMPERATURE}".encode(),
+        digest_size=16,
+    ).digest()
+
+
+class DraftShapeError(ValueError):
+    """The model returned valid JSON that holds no usable email body."""
+
+
+def draft_field(obj: dict, name: str):
+    """obj[name] matched case-insensitively, falling back to a key ending in name (e.g. email_body)."""
+    fallback = None
+    for key, value in obj.items():
+        lowered = key.lower() if isinstance(key, str) else ""
+        if lowered == name:
+            return value
+        if fallback is None and lowered.endswith(name):
+            fallback = value
+    return fallback
+
+
+def draft_from_json(obj) -> dict:
+    """{"subject", "body"} from a decoded draft; raises DraftShapeError rather than guessing."""
+    if not isinstance(obj, dict):
+        raise DraftShapeError(f"expected a JSON object, got {type(obj).__name__}")
+    body = draft_field(obj, "body")
+    if not isinstance(body, str) or not body.strip():
+        raise DraftShapeError(f"no email body in keys {sorted(map(str, obj))}")
+    subject = draft_field(obj, "subject")
+    return {
+        "subject": (subject.strip() if isinstance(subject, str) else "") or "Automated Email",
+        "body": body.strip(),
+    }
 
-    ai_text = completion.choices[0].message.content.strip()
+
+def parse_draft_text(ai_text: str) -> dict:
+    """Fallback for non-JSON output: splits 'Subject: ... Body: ...' text."""
+    ai_text = ai_text.strip()
 
     # Extract subject & body manually
-    subject_match = re.search(r"Subject:\s*(.*)", ai_text)
+    subject_match = SUBJECT_RE.search(ai_text)
     subject = subject_match.group(1).strip() if subject_match else "Automated Email"
 
     # Extract everything after "Body:" or after the subject line
-    body = re.split(r"Body:\s*", ai_text, maxsplit=1)
+    body = BODY_SPLIT_RE.split(ai_text, maxsplit=1)
     body = body[1].strip() if len(body) > 1 else ai_text
 
     return {"subject": subject, "body": body}
 
 
-# ---------------- Utility: Send Email via Brevo ----------------
-def send_brevo_email(to_email: str, subject: str, body: str):
+def record_prompt_cache(completion):
+    """Tallies how much of each prompt Groq served from its prefix cache."""
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    prompt_cache_stats["prompt_tokens"] += usage.prompt_tokens or 0
+    prompt_cache_stats["cached_tokens"] += cached
+    app.logger.debug("🧮 Groq prompt tokens: %s (%s cached)", usage.prompt_tokens, cached)
+
+
+async def complete_draft(context: str) -> dict:
+    """One Groq completion for one email context; text-salvaged drafts carry "fallback"."""
+    completion = await client.chat.completions.create(
+        model=EMAIL_MODEL,
+        messages=[
+            {"role": "system", "content": EMAIL_SYSTEM_PROMPT},
+            {"role": "user", "content": context},
+        ],
+        temperature=EMAIL_TEMPERATURE,
+        max_tokens=350,
+        response_format={"type": "json_object"},
+    )
+    record_prompt_cache(completion)
+    raw = completion.choices[0].message.content or ""
+    try:
+        obj = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        # Only text that isn't JSON at all goes through the Subject:/Body: splitter
+        return {**parse_draft_text(raw), "fallback": True}
+    return draft_from_json(obj)
+
+
+async def complete_draft_batch(contexts: list) -> list:
     """
-    Sends the formatted email using Brevo's transactional API.
+    Drafts several emails in a single Groq completion. Falls back to one call
+    per context if the model's JSON does not line up with the inputs.
     """
-    url = "https://api.brevo.com/v3/smtp/email"
-    headers = {
-        "accept": "application/json",
-        "api-key": BREVO_API_KEY,
-        "content-type": "application/json"
+    numbered = "\n".join(f"{i}. {c}" for i, c in enumerate(contexts, 1))
+    try:
+        completion = await client.chat.completions.create(
+            model=EMAIL_MODEL,
+            messages=[
+                {"role": "system", "content": EMAIL_SYSTEM_PROMPT},
+                {"role": "system", "content": BATCH_DRAFT_INSTRUCTIONS},
+                {"role": "user", "content": numbered},
+            ],
+            temperature=EMAIL_TEMPERATURE,
+            max_tokens=350 * len(contexts),
+            response_format={"type": "json_object"},
+        )
+        record_prompt_cache(completion)
+        emails = orjson.loads(completion.choices[0].message.content)["emails"]
+        if len(emails) == len(contexts):
+            return [draft_from_json(e) for e in emails]
+        app.logger.warning("⚠️ Batch draft returned %d emails for %d contexts", len(emails), len(contexts))
+    except Exception as e:
+        app.logger.warning("⚠️ Batch draft failed, drafting individually: %s", e)
+    return await asyncio.gather(*(complete_draft(c) for c in contexts))
+
+
+async def dispatch_draft_batch(batch: list):
+    """Runs one collected batch and resolves each caller's future."""
+    contexts = [context for _, context, _ in batch]
+    try:
+        if len(batch) == 1:
+            drafts = [await complete_draft(contexts[0])]
+        else:
+            drafts = await complete_draft_batch(contexts)
+    except Exception as e:
+        for _, _, waiter in batch:
+            if not waiter.done():
+                waiter.set_exception(e)
+        return
+
+    for (_, _, waiter), draft in zip(batch, drafts):
+        if not waiter.done():
+            waiter.set_result(draft)
+
+
+async def run_draft_batcher():
+    """
+    Coalesces drafts that share a batch key and arrive within DRAFT_BATCH_WINDOW
+    into one Groq call. Each batch runs as its own task, so a slow completion
+    never holds up collection of the next one.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        pending = [await draft_queue.get()]
+        deadline = loop.time() + DRAFT_BATCH_WINDOW
+        while len(pending) < DRAFT_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                pending.append(await asyncio.wait_for(draft_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Only one caller's contexts may share a prompt
+        groups = {}
+        for item in pending:
+            groups.setdefault(item[0], []).append(item)
+        for batch in groups.values():
+            task = asyncio.create_task(dispatch_draft_batch(batch))
+            draft_batch_tasks.add(task)
+            task.add_done_callback(draft_batch_tasks.discard)
+
+
+async def generate_ai_email(context: str, batch_key: str | None = None) -> dict:
+    """
+    Uses Groq LLM (JSON mode) to generate a well-written, professional email.
+    Identical (prompt, context, model, temperature) requests reuse the cached draft.
+    Misses with a batch_key may share a Groq call with drafts under the same key;
+    without one, the draft gets its own completion.
+    """
+    cache_key = draft_cache_key(context)
+    cached = _draft_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached[0])
+
+    if draft_queue is None or batch_key is None:
+        draft = await complete_draft(context)
+    else:
+        waiter = asyncio.get_running_loop().create_future()
+        draft_queue.put_nowait((batch_key, context, waiter))
+        draft = await waiter
+
+    from_json = not draft.pop("fallback", False)
+    _draft_cache[cache_key] = (draft, from_json)
+    return dict(draft)
+
+
+# ---------------- Bulk Drafts (Groq Batch API) ----------------
+def draft_completion_body(context: str) -> dict:
+    """The same chat completion complete_draft sends, as a batch request body."""
+    return {
+        "model": EMAIL_MODEL,
+        "messages": [
+            {"role": "system", "content": EMAIL_SYSTEM_PROMPT},
+            {"role": "user", "content": context},
+        ],
+        "temperature": EMAIL_TEMPERATURE,
+        "max_tokens": 350,
+        "response_format": {"type": "json_object"},
+    }
+
+
+def bulk_state(batch, items: list) -> dict:
+    return {
+        "status": "queued",
+        "groq_status": batch.status,
+        "input_file_id": batch.input_file_id,
+        "finished_at": None,
+        "items": [
+            {"to": recipient, "context": context, "status": "queued"}
+            for recipient, context in items
+        ],
     }
 
-    # Clean HTML email layout
-    html_body = f"""
+
+async def submit_bulk_drafts(items: list) -> str:
+    """
+    Uploads one JSONL line per (recipient, context) item to Groq's batch API
+    (half the cost of synchronous calls) and returns the Groq batch id.
+    Each custom_id carries "<index>|<recipient>", so the uploaded file alone is
+    enough to recover the batch after a restart.
+    """
+    jsonl = b"\n".join(
+        orjson.dumps({
+            "custom_id": f"{i}|{recipient}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": draft_completion_body(context),
+        })
+        for i, (recipient, context) in enumerate(items)
+    )
+    input_file = await client.files.create(file=("drafts.jsonl", jsonl), purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+        metadata={"agent": BULK_BATCH_TAG},
+    )
+    bulk_batches[batch.id] = bulk_state(batch, items)
+    return batch.id
+
+
+async def recover_bulk_batch(batch):
+    """
+    Rebuilds a batch's state from its Groq input file. Returns None when the
+    batch is not ours or was already delivered (its input file is deleted then).
+    """
+    if (batch.metadata or {}).get("agent") != BULK_BATCH_TAG:
+        return None
+    try:
+        content = await client.files.content(batch.input_file_id)
+    except NotFoundError:
+        return None
+    items = []
+    for raw in (await content.read()).splitlines():
+        if raw.strip():
+            line = orjson.loads(raw)
+            _, recipient = line["custom_id"].split("|", 1)
+            items.append((recipient, line["body"]["messages"][-1]["content"]))
+    state = bulk_batches[batch.id] = bulk_state(batch, items)
+    return state
+
+
+async def deliver_bulk_item(item: dict, line: dict | None):
+    """Sends one drafted bulk email and records its outcome on the item."""
+    try:
+        if line is None or line.get("error"):
+            raise RuntimeError((line or {}).get("error") or "No output for this item")
+        response = line["response"]
+        if response.get("status_code") != 200:
+            raise RuntimeError(f"Groq returned {response.get('status_code')}")
+        raw = response["body"]["choices"][0]["message"]["content"]
+        draft = draft_from_json(orjson.loads(raw))
+        _draft_cache[draft_cache_key(item["context"])] = (draft, True)
+        await send_brevo_email(item["to"], draft["subject"], draft["body"])
+        item.update(status="sent", subject=draft["subject"])
+    except Exception as e:
+        item.update(status="failed", error=str(e))
+
+
+async def finish_bulk_batch(batch_id: str, state: dict, batch):
+    """Downloads a finished Groq batch and sends every drafted email through Brevo."""
+    lines = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        content = await client.files.content(file_id)
+        for raw in (await content.read()).splitlines():
+            if raw.strip():
+                line = orjson.loads(raw)
+                lines[line["custom_id"].split("|", 1)[0]] = line
+
+    state["status"] = "sending"
+    await asyncio.gather(*(
+        deliver_bulk_item(item, lines.get(str(i)))
+        for i, item in enumerate(state["items"])
+    ))
+    close_bulk_state(state, "completed")
+    sent = sum(item["status"] == "sent" for item in state["items"])
+    app.logger.info("📬 Bulk batch %s: %d/%d emails sent", batch_id, sent, len(state["items"]))
+    await forget_bulk_input(state)
+
+
+def close_bulk_state(state: dict, status: str):
+    state["status"] = status
+    state["finished_at"] = time.monotonic()
+
+
+async def forget_bulk_input(state: dict):
+    """Deletes the input file, marking the batch as handled for every future worker."""
+    try:
+        await client.files.delete(state["input_file_id"])
+    except Exception as e:
+        app.logger.warning("⚠️ Could not delete bulk input file: %s", e)
+
+
+async def recover_pending_bulk_batches():
+    """Picks up batches submitted by earlier processes that were never delivered."""
+    try:
+        batches = (await client.batches.list()).data
+    except Exception as e:
+        app.logger.warning("⚠️ Bulk batch recovery failed: %s", e)
+        return
+    for batch in batches:
+        if batch.id in bulk_batches:
+            continue
+        try:
+            if await recover_bulk_batch(batch):
+                app.logger.info("♻️ Recovered bulk batch %s", batch.id)
+        except Exception as e:
+            app.logger.warning("⚠️ Could not recover bulk batch %s: %s", batch.id, e)
+
+
+async def run_bulk_poller():
+    """
+    Polls pending Groq batches every BULK_POLL_INTERVAL and delivers finished ones.
+    Unfinished batches are never dropped; finished ones are kept for BULK_BATCH_TTL.
+    """
+    await recover_pending_bulk_batches()
+    while True:
+        await asyncio.sleep(BULK_POLL_INTERVAL)
+        now = time.monotonic()
+        for batch_id, state in list(bulk_batches.items()):
+            if state["finished_at"] is not None and now - state["finished_at"] > BULK_BATCH_TTL:
+                del bulk_batches[batch_id]
+                continue
+            if state["status"] != "queued":
+                continue
+            try:
+                batch = await client.batches.retrieve(batch_id)
+                state["groq_status"] = batch.status
+                if batch.status == "completed":
+                    await finish_bulk_batch(batch_id, state, batch)
+                elif batch.status in ("failed", "expired", "cancelled"):
+                    close_bulk_state(state, "failed")
+                    for item in state["items"]:
+                        item.update(status="failed", error=f"Groq batch {batch.status}")
+                    await forget_bulk_input(state)
+            except Exception as e:
+                app.logger.warning("⚠️ Bulk batch %s poll failed: %s", batch_id, e)
+
+
+# ---------------- Utility: Send Email via Brevo ----------------
+# Clean HTML email layout, parsed once at import
+HTML_TEMPLATE = Template("""
     <html>
     <body style="font-family: 'Segoe UI', sans-serif; color: #333; line-height: 1.6;">
-        {body.replace('\n', '<br>')}
+        $body
         <br><br>
         <p style="margin-top: 20px;">
             Best regards,<br>
@@ -97,7 +554,32 @@ def send_brevo_email(to_email: str, subject: str, body: str):
         </p>
     </body>
     </html>
+    """)
+
+
+async def send_brevo_email(to_email: str, subject: str, body: str):
     """
+    Sends the formatted email using Brevo's transactional API.
+    An identical (recipient, subject, body) send within IDEMPOTENCY_TTL seconds
+    returns the earlier Brevo response instead of emailing twice.
+    """
+    send_key = hashlib.blake2b(
+        f"{to_email}\0{subject}\0{body}".encode(), digest_size=16
+    ).digest()
+    previous = _recent_sends.get(send_key)
+    if previous is not None:
+        app.logger.info("♻️ Duplicate send to %s suppressed", to_email)
+        return previous
+
+    url = "https://api.brevo.com/v3/smtp/email"
+    headers = {
+        "accept": "application/json",
+        "api-key": BREVO_API_KEY,
+        "content-type": "application/json"
+    }
+
+    # Escape model output so it can't inject markup into the email
+    html_body = HTML_TEMPLATE.substitute(body=html.escape(body).replace("\n", "<br>"))
 
     payload = {
         "sender": {"name": "POS AI Agent", "email": SENDER_EMAIL},
@@ -107,64 +589,261 @@ def send_brevo_email(to_email: str, subject: str, body: str):
         "textContent": body,
     }
 
-    response = requests.post(url, headers=headers, json=payload, timeout=20)
+    response = await http_client.post(url, headers=headers, content=orjson.dumps(payload))
     response.raise_for_status()
-    return response.json()
+    brevo_response = orjson.loads(response.content)
+    _recent_sends[send_key] = brevo_response
+    return brevo_response
+
+
+# ---------------- Draft Pipeline ----------------
+async def compose_and_send(recipient: str, context: str, batch_key: str | None = None) -> dict:
+    """Drafts the email with Groq, sends it via Brevo and returns the API summary."""
+    ai_email = await generate_ai_email(context, batch_key)
+    subject = ai_email["subject"]
+    body = ai_email["body"]
+
+    brevo_response = await send_brevo_email(recipient, subject, body)
+
+    # Clean preview for API response
+    preview = f"Subject: {subject}\n\n{body[:250]}..."
+    return {
+        "to": recipient,
+        "subject": subject,
+        "body_preview": preview,
+        "brevo_response": brevo_response,
+    }
+
+
+async def stream_and_send(recipient: str, context: str):
+    """
+    Streams the Groq draft to the client as SSE "token" events, then sends the
+    finished email via Brevo and ends with a "sent" (or "error") event.
+    """
+    chunks = []
+    try:
+        stream = await client.chat.completions.create(
+            model=EMAIL_MODEL,
+            messages=[
+                {"role": "system", "content": EMAIL_SYSTEM_PROMPT},
+                {"role": "system", "content": STREAM_DRAFT_INSTRUCTIONS},
+                {"role": "user", "content": context},
+            ],
+            temperature=EMAIL_TEMPERATURE,
+            max_tokens=350,
+            stream=True,
+        )
+        async for chunk in stream:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if token:
+                chunks.append(token)
+                yield sse_event("token", {"text": token})
+
+        draft = parse_draft_text("".join(chunks))
+        brevo_response = await send_brevo_email(recipient, draft["subject"], draft["body"])
+        yield sse_event("sent", {
+            "to": recipient,
+            "subject": draft["subject"],
+            "brevo_response": brevo_response,
+        })
+    except Exception as e:
+        app.logger.error("❌ Streamed draft failed: %s", e)
+        yield sse_event("error", {"error": str(e)})
+
+
+async def run_draft_jobs():
+    """Worker for /create_draft?async=true jobs; records the outcome in draft_jobs."""
+    while True:
+        job_id, recipient, context, batch_key = await job_queue.get()
+        draft_jobs[job_id] = {"status": "running"}
+        try:
+            draft_jobs[job_id] = {
+                "status": "sent",
+                **await compose_and_send(recipient, context, batch_key),
+            }
+        except Exception as e:
+            app.logger.error("❌ Draft job %s failed: %s", job_id, e)
+            draft_jobs[job_id] = {"status": "failed", "error": str(e)}
+
+
+# ---------------- Startup ----------------
+@app.before_serving
+async def warm_groq_prompt():
+    """One tiny completion so the shared system-prompt prefix is cached before real traffic."""
+    try:
+        await client.chat.completions.create(
+            model=EMAIL_MODEL,
+            messages=[{"role": "system", "content": EMAIL_SYSTEM_PROMPT}],
+            max_tokens=1,
+        )
+        app.logger.info("🔥 Groq prompt prefix warmed up.")
+    except Exception as e:
+        app.logger.warning("⚠️ Groq warmup failed: %s", e)
+
+
+@app.before_serving
+async def warm_brevo_connection():
+    """Resolve DNS and open a pooled TLS connection to Brevo before real traffic."""
+    try:
+        await http_client.get(
+            "https://api.brevo.com/v3/account",
+            headers={"accept": "application/json", "api-key": BREVO_API_KEY or ""},
+            timeout=5,
+        )
+        app.logger.info("🔥 Brevo connection warmed up.")
+    except Exception as e:
+        app.logger.warning("⚠️ Brevo warmup failed: %s", e)
+
+
+@app.before_serving
+async def start_draft_batcher():
+    global draft_queue, draft_batcher_task
+    draft_queue = asyncio.Queue()
+    draft_batcher_task = asyncio.create_task(run_draft_batcher())
+
+
+@app.before_serving
+async def start_draft_job_workers():
+    global job_queue
+    job_queue = asyncio.Queue()
+    job_worker_tasks.extend(
+        asyncio.create_task(run_draft_jobs()) for _ in range(DRAFT_JOB_WORKERS)
+    )
+
+
+@app.before_serving
+async def start_bulk_poller():
+    global bulk_poller_task
+    bulk_poller_task = asyncio.create_task(run_bulk_poller())
+
+
+@app.after_serving
+async def stop_draft_batcher():
+    if draft_batcher_task:
+        draft_batcher_task.cancel()
+    for task in draft_batch_tasks:
+        task.cancel()
+    if bulk_poller_task:
+        bulk_poller_task.cancel()
+    for task in job_worker_tasks:
+        task.cancel()
+
+
+@app.after_serving
+async def close_http_client():
+    await http_client.aclose()
 
 
 # ---------------- Routes ----------------
 @app.route("/", methods=["GET"])
-def home():
-    return jsonify({
+async def home():
+    return json_response({
         "status": "✅ Simplified AI Email Agent Active",
-        "endpoint": "/create_draft (POST)"
-    }), 200
+        "endpoint": "/create_draft (POST)",
+        "groq_prompt_cache": prompt_cache_stats,
+    }, 200)
 
 
 @app.route("/create_draft", methods=["POST"])
-def create_draft():
+async def create_draft():
     """
     Generates and sends a professional email automatically.
+    With ?async=true the work is queued and a job id is returned (202) for /jobs/<id>;
+    clients sending Accept: text/event-stream receive the draft as it is generated.
+    ?batch=<key> opts in to sharing a Groq call with the caller's other drafts under that key.
     """
     try:
-        data = request.get_json(force=True)
-        user_input = data.get("context", "")
-        explicit_recipient = data.get("to")
-
-        # Extract recipient dynamically
-        recipient = explicit_recipient or extract_recipient(user_input)
-        if not recipient:
-            return jsonify({"error": "No valid recipient found in the message."}), 400
+        try:
+            draft_request = DraftRequest.from_json(await request.get_data(cache=False))
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+        try:
+            recipient, sanitized_context = resolve_draft(draft_request)
+        except DraftInputError as e:
+            return json_response({"error": str(e)}, e.status)
+        batch_key = request.args.get("batch") or None
+
+        if request.args.get("async", "").lower() in ("1", "true", "yes"):
+            job_id = uuid.uuid4().hex
+            draft_jobs[job_id] = {"status": "queued"}
+            job_queue.put_nowait((job_id, recipient, sanitized_context, batch_key))
+            return json_response({"job_id": job_id, "status": "queued"}, 202)
+
+        if "text/event-stream" in request.headers.get("Accept", ""):
+            return Response(
+                stream_and_send(recipient, sanitized_context),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache"},
+            )
+
+        return json_response({
+            "status": "✅ Email Draft Created & Sent",
+            **await compose_and_send(recipient, sanitized_context, batch_key),
+        }, 200)
 
-        # Clean context for AI
-        sanitized_context = re.sub(r"[\w\.-]+@[\w\.-]+\.\w+", "", user_input)
+    except Exception as e:
+        app.logger.exception("❌ Draft failed")
+        return json_response({"error": str(e)}, 500)
 
-        # Generate AI-composed email
-        ai_email = generate_ai_email(sanitized_context)
-        subject = ai_email["subject"]
-        body = ai_email["body"]
 
-        # Send via Brevo
-        brevo_response = send_brevo_email(recipient, subject, body)
+@app.route("/jobs/<job_id>", methods=["GET"])
+async def job_status(job_id):
+    """Outcome of a /create_draft?async=true job."""
+    job = draft_jobs.get(job_id)
+    if job is None:
+        return json_response({"error": "Unknown job id"}, 404)
+    return json_response({"job_id": job_id, **job}, 200)
 
-        # Clean preview for API response
-        preview = f"Subject: {subject}\n\n{body[:250]}..."
 
-        return jsonify({
-            "status": "✅ Email Draft Created & Sent",
-            "to": recipient,
-            "subject": subject,
-            "body_preview": preview,
-            "brevo_response": brevo_response
-        }), 200
+@app.route("/create_draft_bulk", methods=["POST"])
+async def create_draft_bulk():
+    """
+    Drafts and sends many emails via one Groq batch job.
+    Accepts [{"to", "context"}, ...] and returns a batch id (202) for /draft_status/<id>.
+    """
+    try:
+        data = orjson.loads(await request.get_data(cache=False))
+        if not isinstance(data, list) or not data:
+            return json_response({"error": "Request body must be a non-empty JSON array"}, 400)
+        if len(data) > BULK_MAX_ITEMS:
+            return json_response({"error": f"at most {BULK_MAX_ITEMS} drafts per batch"}, 413)
+        try:
+            items = [resolve_draft(DraftRequest.from_dict(entry)) for entry in data]
+        except DraftInputError as e:
+            return json_response({"error": str(e)}, e.status)
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+
+        batch_id = await submit_bulk_drafts(items)
+        return json_response({"batch_id": batch_id, "status": "queued", "count": len(items)}, 202)
 
     except Exception as e:
-        print("❌ Error:", e)
-        traceback.print_exc()
-        return jsonify({
-            "error": str(e),
-            "trace": traceback.format_exc()
-        }), 500
+        app.logger.exception("❌ Bulk draft failed")
+        return json_response({"error": str(e)}, 500)
+
+
+@app.route("/draft_status/<batch_id>", methods=["GET"])
+async def draft_status(batch_id):
+    """Progress of a /create_draft_bulk batch, with one entry per submitted draft."""
+    state = bulk_batches.get(batch_id)
+    if state is None:
+        # Submitted by an earlier process; rebuild it from Groq
+        try:
+            state = await recover_bulk_batch(await client.batches.retrieve(batch_id))
+        except NotFoundError:
+            state = None
+    if state is None:
+        return json_response({"error": "Unknown batch id"}, 404)
+    items = [
+        {k: v for k, v in item.items() if k != "context"}
+        for item in state["items"]
+    ]
+    return json_response({
+        "batch_id": batch_id,
+        "status": state["status"],
+        "groq_status": state["groq_status"],
+        "items": items,
+    }, 200)
 
 
 # ---------------- Main ----------------
@@ -1,7 +1,7 @@
 from flask import Flask, request, jsonify
 import os
-import re
-import json
+import orjson
+from json_repair import repair_json
 from dotenv import load_dotenv
 import google.generativeai as genai
 from groq import Groq
@@ -15,9 +15,53 @@ app = Flask(__name__)
 # Gemini setup
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
+# Fixed research instructions live in system_instruction, so every call shares
+# the same prefix and Gemini's implicit prompt cache can reuse it
+GEMINI_SYSTEM_INSTRUCTION = """
+You are a professional research assistant.
+Summarize the topic given by the user concisely using general publicly available knowledge.
+Avoid giving medical, legal, or financial advice.
+
+Respond ONLY in the following JSON format:
+{
+  "executive_summary": ["point1", "point2", "point3"],
+  "key_findings": ["finding1", "finding2", "finding3"],
+  "notable_sources": ["source 1 (if known)", "source 2 (if known)"],
+  "recommended_next_steps": ["next step 1", "next step 2"]
+}
+"""
+gemini_model = genai.GenerativeModel(
+    "models/gemini-2.5-flash",
+    system_instruction=GEMINI_SYSTEM_INSTRUCTION,
+    generation_config={"temperature": 0.4, "max_output_tokens": 800},
+)
+
 # Groq setup
 groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 
+
+# ---------------------
+# Warmup
+# ---------------------
+def warm_connections():
+    """
+    Opens the Gemini and Groq connections the first query will use. Called per
+    worker from research_gunicorn.conf.py; short timeouts keep a dead host from
+    stalling boot.
+    """
+    try:
+        # Same generative-service client that generate_content uses
+        gemini_model.count_tokens("ping", request_options={"timeout": 5})
+        print("🔥 Gemini connection warmed up.")
+    except Exception as e:
+        print("⚠️ Gemini warmup failed:", e)
+    try:
+        groq_client.with_options(timeout=5, max_retries=0).models.list()
+        print("🔥 Groq connection warmed up.")
+    except Exception as e:
+        print("⚠️ Groq warmup failed:", e)
+
+
 # ---------------------
 # Utility: Clean Model Output
 # ---------------------
@@ -26,69 +70,32 @@ def clean_json_response(raw_text: str):
     Cleans and parses JSON-like text returned by LLMs.
     Handles truncated or fenced outputs gracefully.
     """
-    import re, json
-
     if not raw_text:
         return {}
 
     # Remove ```json fences
-    cleaned = re.sub(r"^```(?:json)?", "", raw_text.strip(), flags=re.IGNORECASE)
-    cleaned = re.sub(r"```$", "", cleaned.strip())
-
-    # Try to extract the JSON-like portion
-    match = re.search(r"\{.*\}", cleaned, flags=re.DOTALL)
-    if not match:
-        return {"raw_text": cleaned}
-
-    json_candidate = match.group(0)
-
-    # Auto-fix: if closing bracket is missing, append one
-    if json_candidate.count("{") > json_candidate.count("}"):
-        json_candidate += "}"
+    cleaned = raw_text.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
 
     try:
-        return json.loads(json_candidate)
-    except json.JSONDecodeError:
-        # Attempt to parse partial JSON content
-        fixed = json_candidate.replace("\n", "").replace("\t", "")
-        fixed = re.sub(r",\s*]", "]", fixed)
-        fixed = re.sub(r",\s*}", "}", fixed)
-        try:
-            return json.loads(fixed)
-        except Exception:
-            return {"raw_text": cleaned}
+        return orjson.loads(cleaned)
+    except orjson.JSONDecodeError:
+        pass
+
+    # Repair missing brackets, trailing commas and surrounding prose in one pass
+    repaired = repair_json(cleaned, return_objects=True)
+    if isinstance(repaired, dict) and repaired:
+        return repaired
+    return {"raw_text": cleaned}
 
 
 # ---------------------
 # Research Functions
 # ---------------------
 def research_with_gemini(query):
-    prompt = f"""
-You are a professional research assistant.
-Summarize the following topic concisely using general publicly available knowledge.
-Avoid giving medical, legal, or financial advice.
-
-Topic: "{query}"
-
-Respond ONLY in the following JSON format:
-{{
-  "executive_summary": ["point1", "point2", "point3"],
-  "key_findings": ["finding1", "finding2", "finding3"],
-  "notable_sources": ["source 1 (if known)", "source 2 (if known)"],
-  "recommended_next_steps": ["next step 1", "next step 2"]
-}}
-"""
-
-    model = genai.GenerativeModel("models/gemini-2.5-flash")
+    prompt = f'Topic: "{query}"'
 
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                "temperature": 0.4,
-                "max_output_tokens": 800,
-            },
-        )
+        response = gemini_model.generate_content(prompt)
 
         if not response or not getattr(response, "text", None):
             reason = getattr(response.candidates[0], "finish_reason", "unknown")
@@ -173,4 +180,5 @@ def research():
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 10000))
     print(f"🚀 Running on port {port}")
+    warm_connections()
     app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,8 @@
+# Gunicorn settings for the research agent (see render.yaml)
+
+
+def post_worker_init(worker):
+    """Warm Gemini and Groq once the worker has loaded the app, not at import."""
+    from research_agent import warm_connections
+
+    warm_connections()
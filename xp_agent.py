@@ -1,22 +1,27 @@
-from flask import Flask, request, jsonify
+from quart import Quart, request, jsonify
 import os
-import requests
-from datetime import datetime
+import logging
+import httpx
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-import pytz
-import json
-import math
+import orjson
+import asyncio
+import hashlib
+from functools import lru_cache, partial
+from rapidfuzz import fuzz, process, utils
+from cachetools import LRUCache, TTLCache
 
 # Optional Groq client for reasoning
 try:
-    from groq import Groq
+    from groq import AsyncGroq
 except Exception:
-    Groq = None
+    AsyncGroq = None
 
 # ---------------- Setup ----------------
-app = Flask(__name__)
+app = Quart(__name__)
 load_dotenv()
-IST = pytz.timezone("Asia/Kolkata")
+logging.basicConfig(level=logging.INFO)
+IST = timezone(timedelta(hours=5, minutes=30), "Asia/Kolkata")  # no DST, fixed offset is exact
 
 # ---------------- ENV ----------------
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
@@ -25,159 +30,298 @@ NOTION_XP_LEDGER_ID = os.getenv("NOTION_XP_LEDGER_ID")  # optional
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 PORT = int(os.getenv("PORT", 10003))
+OPEN_TASKS_TTL = 300  # seconds a fetched open-task list is trusted
+OPEN_TASKS_REFRESH = 60  # seconds between background reloads
+# Only tasks edited in the last N days are matchable; 0 keeps every open task
+OPEN_TASKS_EDITED_WITHIN_DAYS = int(os.getenv("OPEN_TASKS_EDITED_WITHIN_DAYS", 0))
+BASE_XP = 15  # reward for a task completed on its due day
+HEURISTIC_MIN_SCORE = 60  # weakest fuzzy match the fallback will accept
+# Groq is skipped only when one title clearly wins on token_set_ratio; WRatio
+# alone scores 85+ on a single shared word
+CONFIDENT_TITLE_SCORE = 90
+CONFIDENT_TITLE_MARGIN = 20  # lead over the runner-up title; closer calls go to Groq
+MATCH_CANDIDATES = 10  # most tasks shown to Groq per match
+AWARD_IDEMPOTENCY_TTL = 60  # seconds a repeated (source, message) returns the earlier award
+LEDGER_QUEUE_SIZE = 1024  # pending ledger writes before new ones are dropped
+LEDGER_FLUSH_TIMEOUT = 10  # seconds shutdown waits for queued ledger writes
+LEDGER_BATCH_SIZE = 10  # most ledger writes sent together
+LEDGER_BATCH_WINDOW = 0.1  # seconds a write waits for others to join its batch
+LEDGER_CONCURRENCY = 3  # in-flight ledger POSTs; Notion allows ~3 req/s per integration
+LEDGER_RATE_LIMIT_RETRIES = 3  # 429 retries per ledger write, honouring Retry-After
 NOTION_BASE = "https://api.notion.com/v1"
 
 HEADERS = {
     "Authorization": f"Bearer {NOTION_API_KEY}",
     "Notion-Version": "2022-06-28",
-    "Content-Type": "application/json"
+    "Content-Type": "application/json",
+    "Accept-Encoding": "gzip, br",  # br decoding needs httpx[brotli]
 }
 
-groq_client = Groq(api_key=GROQ_API_KEY) if (GROQ_API_KEY and Groq is not None) else None
+# Shared HTTP/2 pool to api.notion.com, opened per worker in before_serving
+notion_client = None
+
+# HTTP/2 keep-alive pool with connect retries for Groq; concurrent matches
+# multiplex over one TLS connection
+groq_http_client = httpx.AsyncClient(
+    timeout=20,
+    transport=httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=10),
+    ),
+)
+groq_client = (
+    # Bounded so a stuck completion can't hold /award_xp past ~20 s; the
+    # heuristic answers instead
+    AsyncGroq(api_key=GROQ_API_KEY, http_client=groq_http_client, timeout=10.0, max_retries=1)
+    if (GROQ_API_KEY and AsyncGroq is not None) else None
+)
+
+# Static instructions sent first in every match so Groq can reuse the prefix
+MATCH_SYSTEM_PROMPT = """
+    You are an intelligent task matcher.
+    Choose which of the user's numbered tasks best matches their completion message.
+    Return ONLY a JSON object:
+    {"index": <1-based index>, "reason": "<short reason>"}
+    """
+
+# "open" -> task summaries; kept warm by refresh_open_tasks so /award_xp skips the query
+_open_tasks_cache = TTLCache(maxsize=1, ttl=OPEN_TASKS_TTL)
+
+# Page ids completed (or being completed) here recently. Notion queries that were
+# already in flight can still list them as open, so loads filter through this
+_completed_tasks = TTLCache(maxsize=4096, ttl=OPEN_TASKS_TTL)
+open_tasks_refresher = None
+
+AWARDED = "✅ XP Awarded"
+
+# blake2b(source|message) -> in-flight award task, then the response body of a
+# successful award for AWARD_IDEMPOTENCY_TTL seconds
+_recent_awards = TTLCache(maxsize=1024, ttl=AWARD_IDEMPOTENCY_TTL)
+
+# (action, xp, source, timestamp) ledger writes, drained by run_ledger_writer
+ledger_queue = None
+ledger_writer_task = None
+ledger_semaphore = None
+
+# (page_id, last_edited_time) -> task summary, so unchanged pages aren't re-parsed
+_summary_cache = LRUCache(maxsize=10000)
 
 
 # ---------------- Helpers ----------------
-def notion_query_open_tasks():
-    """Fetch tasks in 'To Do' or 'In Progress' status."""
-    url = f"{NOTION_BASE}/databases/{NOTION_TASK_DATABASE_ID}/query"
-    body = {
-        "filter": {
-            "or": [
-                {"property": "Status", "select": {"equals": "To Do"}},
-                {"property": "Status", "select": {"equals": "In Progress"}}
-            ]
-        }
+async def notion_query_open_tasks():
+    """Fetch every task in 'To Do' or 'In Progress' status, following pagination."""
+    url = f"/databases/{NOTION_TASK_DATABASE_ID}/query"
+    status_filter = {
+        "or": [
+            {"property": "Status", "select": {"equals": "To Do"}},
+            {"property": "Status", "select": {"equals": "In Progress"}}
+        ]
     }
-    r = requests.post(url, headers=HEADERS, json=body, timeout=15)
-    r.raise_for_status()
-    return r.json().get("results", [])
+    if OPEN_TASKS_EDITED_WITHIN_DAYS:
+        since = datetime.now(IST) - timedelta(days=OPEN_TASKS_EDITED_WITHIN_DAYS)
+        status_filter = {"and": [
+            status_filter,
+            {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": since.isoformat()}},
+        ]}
+    body = {"filter": status_filter, "page_size": 100}
+    results = []
+    while True:
+        r = await notion_client.post(url, json=body)
+        r.raise_for_status()
+        data = orjson.loads(r.content)
+        results.extend(data.get("results", []))
+        if not data.get("has_more"):
+            return results
+        body["start_cursor"] = data["next_cursor"]
+
+
+async def load_open_tasks():
+    """Queries Notion and caches the summaries, minus tasks completed meanwhile."""
+    pages = await notion_query_open_tasks()
+    tasks = [summarize_page(p) for p in pages if p["id"] not in _completed_tasks]
+    _open_tasks_cache["open"] = tasks
+    return tasks
+
+
+async def get_open_tasks():
+    """Open task summaries, served from the TTL cache when fresh."""
+    tasks = _open_tasks_cache.get("open")
+    if tasks is None:
+        tasks = await load_open_tasks()
+    return tasks
+
+
+def forget_open_task(page_id):
+    """Drop a task that was just completed so it cannot be matched again."""
+    _completed_tasks[page_id] = True
+    tasks = _open_tasks_cache.get("open")
+    if tasks is not None:
+        _open_tasks_cache["open"] = [t for t in tasks if t["id"] != page_id]
+
+
+async def refresh_open_tasks():
+    """Reloads the open-task list every OPEN_TASKS_REFRESH seconds."""
+    while True:
+        try:
+            await load_open_tasks()
+        except Exception as e:
+            app.logger.warning("⚠️ Open-task refresh failed: %s", e)
+        await asyncio.sleep(OPEN_TASKS_REFRESH)
+
+
+def summarize_page(page):
+    """extract_task_summary, reused while the page's last_edited_time is unchanged."""
+    key = (page["id"], page.get("last_edited_time"))
+    summary = _summary_cache.get(key)
+    if summary is None:
+        summary = _summary_cache[key] = extract_task_summary(page)
+    return summary
+
+
+def rich_text_extractor(kind):
+    """Extractor joining the plain text of a title/rich_text property."""
+    return lambda prop: "".join(t.get("plain_text", "") for t in prop.get(kind) or ()).strip()
+
+
+@lru_cache(maxsize=4096)
+def parse_due_date(start):
+    """ISO date(-time) -> datetime; many tasks share a due date, so parses are memoized."""
+    try:
+        return datetime.fromisoformat(start)
+    except ValueError:
+        return None
+
+
+def extract_due_date(prop):
+    start = (prop.get("date") or {}).get("start")
+    return parse_due_date(start) if start else None
+
+
+# Summary field -> (Notion property name, extractor, value when the property is absent)
+TASK_PROPERTIES = (
+    ("title", "Task", rich_text_extractor("title"), ""),
+    ("context", "Context", rich_text_extractor("rich_text"), ""),
+    ("due_date", "Due Date", extract_due_date, None),
+    ("xp", "XP", lambda prop: prop.get("number"), None),
+)
 
 
 def extract_task_summary(page):
     """Extract summary info from a Notion page."""
     props = page.get("properties", {})
-    task = props.get("Task", {}).get("title", [])
-    title = "".join([t.get("plain_text", "") for t in task]).strip()
-
-    context = ""
-    if "Context" in props:
-        rt = props["Context"].get("rich_text", [])
-        context = "".join([t.get("plain_text", "") for t in rt]).strip()
-
-    due_date = None
-    if "Due Date" in props and props["Due Date"].get("date"):
-        dd = props["Due Date"]["date"].get("start")
-        if dd:
-            try:
-                due_date = datetime.fromisoformat(dd)
-            except Exception:
-                pass
+    summary = {"id": page["id"]}
+    for field, name, extract, default in TASK_PROPERTIES:
+        prop = props.get(name)
+        summary[field] = extract(prop) if prop else default
+    # Normalized once here (and cached per page) instead of on every match
+    summary["match_text"] = utils.default_process(f"{summary['title']} {summary['context']}")
+    summary["title_match"] = utils.default_process(summary["title"])
+    return summary
 
-    xp = props.get("XP", {}).get("number")
-    return {
-        "id": page["id"],
-        "title": title,
-        "context": context,
-        "due_date": due_date,
-        "xp": xp
-    }
 
-
-def compute_xp_from_due(due_date):
+def compute_xp_from_due(due_date, now=None):
     """Compute XP reward based on timing difference."""
-    base_xp = 15
-    now = datetime.now(IST)
-
     if not due_date:
-        return base_xp
+        return BASE_XP
 
     if due_date.tzinfo is None:
-        due_date = IST.localize(due_date)
-    delta_hours = (due_date - now).total_seconds() / 3600.0
+        due_date = due_date.replace(tzinfo=IST)
+    delta_s = int((due_date - (now or datetime.now(IST))).total_seconds())
+    days = abs(delta_s) // 86400
 
-    if delta_hours > 0:  # Early
-        bonus = min(5, int(delta_hours // 24))
-        xp = base_xp + bonus
-    else:  # Late
-        days_late = math.floor(abs(delta_hours) / 24)
-        penalty = days_late * 3
-        xp = max(2, base_xp - penalty)
+    if delta_s > 0:  # Early
+        return BASE_XP + min(5, days)
+    return max(2, BASE_XP - days * 3)  # Late
 
-    return int(min(max(1, xp), 50))
 
-
-def patch_notion_task(page_id, xp):
+async def patch_notion_task(page_id, xp):
     """Update XP and mark task as Completed."""
-    url = f"{NOTION_BASE}/pages/{page_id}"
+    url = f"/pages/{page_id}"
     body = {
         "properties": {
             "XP": {"number": xp},
             "Status": {"select": {"name": "Completed"}}
         }
     }
-    r = requests.patch(url, headers=HEADERS, json=body, timeout=15)
+    r = await notion_client.patch(url, json=body)
     r.raise_for_status()
     return r.json()
 
 
-def groq_match_task(message, candidates):
-    """Use Groq reasoning or heuristic to find best task match."""
-    if not candidates:
-        return None
+def rank_candidates(message, candidates):
+    """Top MATCH_CANDIDATES (score, task) pairs by RapidFuzz similarity to title + context."""
+    ranked = process.extract(
+        utils.default_process(message),
+        [c["match_text"] for c in candidates],
+        scorer=fuzz.WRatio,
+        limit=MATCH_CANDIDATES,
+    )
+    return [(score, candidates[idx]) for _, score, idx in ranked]
 
-    candidate_text = "\n".join(
-        [f"{i+1}. {c['title']} | context: {c['context'] or 'none'}" for i, c in enumerate(candidates)]
+
+def confident_title_match(message, candidates):
+    """The task whose title clearly beats every other title, or None."""
+    top = process.extract(
+        utils.default_process(message),
+        [c["title_match"] for c in candidates],
+        scorer=fuzz.token_set_ratio,
+        limit=2,
     )
+    if not top or top[0][1] < CONFIDENT_TITLE_SCORE:
+        return None
+    if len(top) > 1 and top[0][1] - top[1][1] < CONFIDENT_TITLE_MARGIN:
+        return None
+    return candidates[top[0][2]]
 
-    prompt = f"""
-    You are an intelligent task matcher.
-    Choose which of the following tasks best matches the user's completion message.
-    Return ONLY valid JSON:
-    {{"index": <1-based index>, "reason": "<short reason>"}}
 
-    Tasks:
-    {candidate_text}
+async def groq_match_task(message, candidates):
+    """Use Groq reasoning or heuristic to find best task match."""
+    if not candidates:
+        return None
 
-    Message: "{message}"
-    """
+    ranked = rank_candidates(message, candidates)
+    best = ranked[0] if ranked and ranked[0][0] >= HEURISTIC_MIN_SCORE else None
+
+    # Only an unambiguous title match is trusted to complete a task without the LLM
+    confident = confident_title_match(message, candidates)
+    if confident:
+        return {"task": confident, "reason": "Heuristic match"}
 
     if groq_client:
+        # Only the best-ranked few go to Groq, keeping the prompt short
+        top = [c for _, c in ranked]
+        candidate_text = "\n".join(
+            f"{i}. {c['title']} | context: {c['context'] or 'none'}" for i, c in enumerate(top, 1)
+        )
         try:
-            completion = groq_client.chat.completions.create(
+            completion = await groq_client.chat.completions.create(
                 model="llama-3.3-70b-versatile",
-                messages=[{"role": "system", "content": prompt}],
+                messages=[
+                    {"role": "system", "content": MATCH_SYSTEM_PROMPT},
+                    {"role": "user", "content": f'Tasks:\n{candidate_text}\n\nMessage: "{message}"'},
+                ],
                 temperature=0.0,
                 max_tokens=256,
+                response_format={"type": "json_object"},
             )
-            raw = completion.choices[0].message.content.strip()
-            if raw.startswith("```"):
-                raw = raw.strip("`")
-            raw_json = raw[raw.find("{"):raw.rfind("}")+1]
-            data = json.loads(raw_json)
+            data = orjson.loads(completion.choices[0].message.content)
             idx = int(data.get("index", 0)) - 1
-            if 0 <= idx < len(candidates):
-                return {"task": candidates[idx], "reason": data.get("reason", "")}
+            if 0 <= idx < len(top):
+                return {"task": top[idx], "reason": data.get("reason", "")}
+        except (orjson.JSONDecodeError, TypeError, ValueError, AttributeError) as e:
+            app.logger.warning("⚠️ Groq returned an unusable match: %s", e)
         except Exception as e:
-            print("⚠️ Groq error:", e)
+            app.logger.warning("⚠️ Groq error: %s", e)
 
     # fallback heuristic
-    msg = message.lower()
-    best = None
-    for c in candidates:
-        score = 0
-        if c["title"] and c["title"].lower() in msg:
-            score += 10
-        if c["context"] and any(w.lower() in msg for w in c["context"].split()):
-            score += 3
-        if score > 0 and (best is None or score > best[0]):
-            best = (score, c)
     if best:
         return {"task": best[1], "reason": "Heuristic match"}
     return None
 
 
-def log_to_ledger(action_name, xp, source):
-    """Optional XP ledger logging."""
+async def log_to_ledger(action_name, xp, source, timestamp=None):
+    """Optional XP ledger logging; timestamp is an ISO string, defaulting to now."""
     if not NOTION_XP_LEDGER_ID:
         return None
     try:
@@ -187,64 +331,217 @@ def log_to_ledger(action_name, xp, source):
                 "Action": {"title": [{"text": {"content": action_name}}]},
                 "XP Earned": {"number": xp},
                 "Source": {"rich_text": [{"text": {"content": source}}]},
-                "Timestamp": {"date": {"start": datetime.now(IST).isoformat()}}
+                "Timestamp": {"date": {"start": timestamp or datetime.now(IST).isoformat()}}
             }
         }
-        resp = requests.post(f"{NOTION_BASE}/pages", headers=HEADERS, json=payload, timeout=10)
-        if resp.status_code in [200, 201]:
-            print(f"🪙 Logged {xp} XP for '{action_name}'")
-            return True
+        for attempt in range(LEDGER_RATE_LIMIT_RETRIES + 1):
+            async with ledger_semaphore:
+                resp = await notion_client.post("/pages", json=payload, timeout=10)
+            if resp.status_code in [200, 201]:
+                app.logger.info("🪙 Logged %s XP for '%s'", xp, action_name)
+                return True
+            if resp.status_code != 429 or attempt == LEDGER_RATE_LIMIT_RETRIES:
+                break
+            await asyncio.sleep(float(resp.headers.get("Retry-After", 1)))
+        app.logger.warning(
+            "⚠️ Ledger logging failed (%s) for '%s': %.200s", resp.status_code, action_name, resp.text
+        )
     except Exception as e:
-        print("⚠️ Ledger logging failed:", e)
+        app.logger.warning("⚠️ Ledger logging failed: %s", e)
     return False
 
 
+def enqueue_ledger(action_name, xp, source, timestamp):
+    """Queues a ledger write so /award_xp can respond without waiting on Notion."""
+    if not NOTION_XP_LEDGER_ID:
+        return
+    try:
+        ledger_queue.put_nowait((action_name, xp, source, timestamp))
+    except asyncio.QueueFull:
+        app.logger.warning("⚠️ Ledger queue full, dropped %s XP for '%s'", xp, action_name)
+
+
+async def run_ledger_writer():
+    """
+    Collects ledger entries arriving within LEDGER_BATCH_WINDOW and posts them
+    concurrently, so a burst of awards shares one HTTP/2 connection.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await ledger_queue.get()]
+        deadline = loop.time() + LEDGER_BATCH_WINDOW
+        while len(batch) < LEDGER_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(ledger_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            await asyncio.gather(*(log_to_ledger(*entry) for entry in batch))
+        finally:
+            for _ in batch:
+                ledger_queue.task_done()
+
+
+# ---------------- Lifecycle ----------------
+@app.before_serving
+async def open_notion_client():
+    global notion_client
+    notion_client = httpx.AsyncClient(
+        base_url=NOTION_BASE,
+        headers=HEADERS,
+        timeout=15,
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=3,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        ),
+    )
+
+
+@app.before_serving
+async def warm_notion_connection():
+    """Resolve DNS and open a pooled TLS connection to Notion before real traffic."""
+    try:
+        r = await notion_client.get("/users/me", timeout=5)
+        app.logger.info("🔥 Notion connection warmed up (%s).", r.http_version)
+    except Exception as e:
+        app.logger.warning("⚠️ Notion warmup failed: %s", e)
+
+
+@app.before_serving
+async def warm_groq_connection():
+    """One tiny completion so the first match skips the TLS handshake and hits a cached prefix."""
+    if not groq_client:
+        return
+    try:
+        await groq_client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[{"role": "system", "content": MATCH_SYSTEM_PROMPT}],
+            max_tokens=1,
+        )
+        app.logger.info("🔥 Groq connection warmed up.")
+    except Exception as e:
+        app.logger.warning("⚠️ Groq warmup failed: %s", e)
+
+
+@app.before_serving
+async def start_open_tasks_refresher():
+    global open_tasks_refresher
+    open_tasks_refresher = asyncio.create_task(refresh_open_tasks())
+
+
+@app.before_serving
+async def start_ledger_writer():
+    global ledger_queue, ledger_writer_task, ledger_semaphore
+    ledger_queue = asyncio.Queue(maxsize=LEDGER_QUEUE_SIZE)
+    ledger_semaphore = asyncio.Semaphore(LEDGER_CONCURRENCY)
+    ledger_writer_task = asyncio.create_task(run_ledger_writer())
+
+
+@app.after_serving
+async def close_notion_client():
+    if open_tasks_refresher:
+        open_tasks_refresher.cancel()
+    if ledger_writer_task:
+        # Let queued ledger writes reach Notion before the client closes
+        try:
+            await asyncio.wait_for(ledger_queue.join(), LEDGER_FLUSH_TIMEOUT)
+        except asyncio.TimeoutError:
+            app.logger.warning("⚠️ Shutdown dropped %d ledger writes", ledger_queue.qsize())
+        ledger_writer_task.cancel()
+    if notion_client:
+        await notion_client.aclose()
+    await groq_http_client.aclose()
+
+
 # ---------------- Routes ----------------
 @app.route("/", methods=["GET"])
-def health():
+async def health():
     return jsonify({"status": "✅ XP Agent v5 Running (Reasoning-Only Mode)"}), 200
 
 
+async def run_award(message, source):
+    """Match, complete and log one award; returns the response body."""
+    tasks = await get_open_tasks()
+    if not tasks:
+        return {"status": "no_open_tasks"}
+
+    if app.logger.isEnabledFor(logging.DEBUG):
+        app.logger.debug("🔍 Matching against open tasks:")
+        for t in tasks:
+            app.logger.debug("• %s (context: %s)", t["title"], t["context"])
+
+    match = await groq_match_task(message, tasks)
+    if not match:
+        return {"status": "no_match", "message": "No matching task found"}
+
+    matched_task = match["task"]
+    reason = match["reason"]
+    # One clock read serves both the XP timing and the ledger timestamp
+    now = datetime.now(IST)
+    xp = compute_xp_from_due(matched_task["due_date"], now)
+    # Claim the task before the PATCH so a concurrent award can't complete it twice
+    if matched_task["id"] in _completed_tasks:
+        return {"status": "already_completed", "matched_task": matched_task["title"]}
+    forget_open_task(matched_task["id"])
+    try:
+        patch_resp = await patch_notion_task(matched_task["id"], xp)
+    except Exception:
+        _completed_tasks.pop(matched_task["id"], None)
+        _open_tasks_cache.pop("open", None)  # reload so the task is offered again
+        raise
+    # The caller doesn't need the ledger result, so it is written in the background
+    enqueue_ledger(matched_task["title"], xp, source, now.isoformat())
+
+    return {
+        "status": AWARDED,
+        "matched_task": matched_task["title"],
+        "reason": reason,
+        "xp": xp,
+        "notion_id": matched_task["id"],
+        "notion_update": patch_resp
+    }
+
+
+def settle_award(award_key, task):
+    """Keeps a successful award for retries; anything else may be tried again."""
+    if not task.cancelled() and task.exception() is None and task.result()["status"] == AWARDED:
+        _recent_awards[award_key] = task.result()
+    else:
+        _recent_awards.pop(award_key, None)
+
+
 @app.route("/award_xp", methods=["POST"])
-def award_xp():
+async def award_xp():
     try:
-        data = request.get_json(force=True)
+        data = await request.get_json(force=True)
         message = data.get("message", "").strip()
         source = data.get("source", "Parent Agent")
 
         if not message:
             return jsonify({"error": "Missing 'message'"}), 400
 
-        pages = notion_query_open_tasks()
-        tasks = [extract_task_summary(p) for p in pages]
-        if not tasks:
-            return jsonify({"status": "no_open_tasks"}), 200
-
-        print("🔍 Matching against open tasks:")
-        for t in tasks:
-            print(f"• {t['title']} (context: {t['context']})")
-
-        match = groq_match_task(message, tasks)
-        if not match:
-            return jsonify({"status": "no_match", "message": "No matching task found"}), 200
-
-        matched_task = match["task"]
-        reason = match["reason"]
-        xp = compute_xp_from_due(matched_task["due_date"])
-        patch_resp = patch_notion_task(matched_task["id"], xp)
-        log_to_ledger(matched_task["title"], xp, source)
-
-        return jsonify({
-            "status": "✅ XP Awarded",
-            "matched_task": matched_task["title"],
-            "reason": reason,
-            "xp": xp,
-            "notion_id": matched_task["id"],
-            "notion_update": patch_resp
-        }), 200
+        # A retry shares the in-flight award (or its result) instead of re-running the
+        # pipeline; the award runs as its own task so a disconnecting client can't cancel it
+        award_key = hashlib.blake2b(f"{source}\0{message}".encode(), digest_size=16).digest()
+        award = _recent_awards.get(award_key)
+        if award is None:
+            award = asyncio.ensure_future(run_award(message, source))
+            _recent_awards[award_key] = award
+            award.add_done_callback(partial(settle_award, award_key))
+        else:
+            app.logger.info("♻️ Duplicate award request joined the earlier one")
+
+        if isinstance(award, asyncio.Future):
+            award = await asyncio.shield(award)
+        return jsonify(award), 200
 
     except Exception as e:
-        print("❌ Error:", e)
+        app.logger.exception("❌ Award failed")
         return jsonify({"error": str(e)}), 500
 
 